@@ -1,6 +1,7 @@
-import numpy as np
 import pandas as pd
 import datetime
+import glob
+import gzip
 import os
 import csv
 import shutil
@@ -9,12 +10,12 @@ import logging
 import copy
 import sys
 import campype_config as cfg
-import requests
 import json
 from terminal_banner import Banner
-from subprocess import call
+from subprocess import call, run, Popen, CalledProcessError
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
 from Bio import SeqIO
-from io import StringIO
+from Bio.SeqIO.FastaIO import SimpleFastaParser
 
 def welcome(banner_img):
     img_file = open(banner_img)
@@ -30,19 +31,16 @@ def read_input_files(indexfile):
     Returns:
         files_data {dict} -- Dict containing forward read file path, reverse read file path and file basename (just the sample number).
     """
-    files_df = pd.read_csv(indexfile, sep="\t")
-    # Replace nans with empty strings
-    files_df = files_df.fillna("")
-    files_data = dict()
-    for _, row in files_df.iterrows():
-        files_data[str(row["Samples"])] = {"FW": str(row["Forward"]), 
-                                          "RV": str(row["Reverse"]), 
-                                          "Genus": str(row["Genus"]), 
-                                          "Species": str(row["Species"])}
-    return files_data
+    with open(indexfile, newline='') as index_file:
+        # Empty cells come through as "" (or None on short rows), like the old fillna("")
+        return {str(row["Samples"]): {"FW": row["Forward"] or "",
+                                      "RV": row["Reverse"] or "",
+                                      "Genus": row["Genus"] or "",
+                                      "Species": row["Species"] or ""}
+                for row in csv.DictReader(index_file, delimiter="\t")}
 
 def trimmomatic_call(input_file1, input_file2, phred, trimfile,
-                    paired_out_file1, paired_out_file2, unpaired_out_file1, unpaired_out_file2, threads=None):
+                    paired_out_file1, paired_out_file2, unpaired_out_file1, unpaired_out_file2, threads=None, background=False):
     """
     Trimmomatic call.
     
@@ -55,69 +53,88 @@ def trimmomatic_call(input_file1, input_file2, phred, trimfile,
         paired_out_file2 {string} -- Reverse file paired output.
         unpaired_out_file1 {string} -- Forward file unpaired output.
         unpaired_out_file2 {string} -- Reverse file unpaired output.
-    
+
+    Keyword Arguments:
+        background {bool} -- Launch Trimmomatic without waiting for it (the paired outputs
+                             can then be named pipes drained by a downstream tool). The
+                             caller is responsible for waiting on the returned process.
+
     Returns:
         {int} -- Execution state (0 if everything is all right)
     """
-    arguments = ["trimmomatic", "PE", phred, input_file1, input_file2, \
-                paired_out_file1, unpaired_out_file1, paired_out_file2, unpaired_out_file2, trimfile]
+    arguments = ["trimmomatic", "PE"]
+    # Trimmomatic only honours options placed before the input/output files
     if threads:
         arguments.extend(["-threads", str(threads)])
-    return call(arguments)
-
+    arguments.extend([phred, input_file1, input_file2, \
+                paired_out_file1, unpaired_out_file1, paired_out_file2, unpaired_out_file2, trimfile])
+    if background:
+        return Popen(arguments)
+    return run(arguments, check=True).returncode
+
+
+# The filtering parameters never change once the workflow starts, so the
+# constant part of the prinseq command line is built a single time at import
+# instead of once per sample
+_PRINSEQ_CONST_ARGS = ("-min_len", str(cfg.config["read_qc_filtering"]["min_len"]),
+                       "-min_qual_mean", str(cfg.config["read_qc_filtering"]["min_qual_mean"]),
+                       "-trim_qual_right", str(cfg.config["read_qc_filtering"]["trim_qual_right"]),
+                       "-trim_qual_window", str(cfg.config["read_qc_filtering"]["trim_qual_window"]),
+                       "-trim_qual_type", "mean", "-out_format", "3", "-out_bad", "null")
 
 def prinseq_call(input_file1, input_file2, output_folder, sample, log_name=None):
     """
     Prinseq call
-    
+
     Arguments:
         input_file1 {string} -- Input file forward (and route).
         input_file2 {string} -- Input file reverse (and route).
         output_folder {string} -- Output folder.
-    
+
     Keyword Arguments:
         log_name {string} -- Output log file name.
-    
+
     Returns:
         int -- Execution state (0 if everything is all right)
     """
-    arguments = ["prinseq-lite.pl", "-fastq", input_file1, "-fastq2", input_file2, "-min_len", str(cfg.config["read_qc_filtering"]["min_len"]), \
-                "-min_qual_mean", str(cfg.config["read_qc_filtering"]["min_qual_mean"]), "-trim_qual_right", str(cfg.config["read_qc_filtering"]["trim_qual_right"]), "-trim_qual_window", \
-                str(cfg.config["read_qc_filtering"]["trim_qual_window"]), "-trim_qual_type", "mean", "-out_format", "3", "-out_good", output_folder+"/"+sample, "-out_bad", "null", log_name]
-    return call(arguments)
+    arguments = ["prinseq-lite.pl", "-fastq", input_file1, "-fastq2", input_file2,
+                *_PRINSEQ_CONST_ARGS, "-out_good", output_folder+"/"+sample, log_name]
+    return run(arguments, check=True).returncode
 
 
-def refactor_prinseq_output(input_dir, sample):
+def refactor_prinseq_output(input_dir, sample, compressed_mode=False):
     """
     Rename and remove some files from prinseq.
-    
+
     Arguments:
         input_dir {list} -- Input directory.
         sample {string} -- Sample basename.
-    
+
+    Keyword Arguments:
+        compressed_mode {bool} -- Compress the refactored files too (input files were compressed).
+
     Returns:
         {dict} -- names of refactored files. key: forward or reverse (R1 or R2), value: filename
     """
     filenames = dict()  # Files with good sequences (except singletons)
-    for root, _dirs, files in os.walk(input_dir):
-        for filename in files:
-            if filename.__contains__("singletons"):
-                os.remove(os.path.join(root, filename))
-            else:
-                if filename.__contains__("_1"):
-                    new_filename = os.path.join(root, sample+"_R1.fastq")
-                    os.rename(os.path.join(root, filename), new_filename)
-                    filenames["R1"] = new_filename
-                elif filename.__contains__("_2"):
-                    new_filename = os.path.join(root, sample+"_R2.fastq")
-                    os.rename(os.path.join(root, filename), new_filename)
-                    filenames["R2"] = new_filename
+    # Prinseq's -out_good names are deterministic (<sample>_1.fastq /
+    # <sample>_2.fastq plus optional *_singletons.fastq), so the known files can
+    # be renamed and removed directly without scanning the directory
+    for read in ("1", "2"):
+        try:
+            os.remove(os.path.join(input_dir, sample+"_"+read+"_singletons.fastq"))
+        except FileNotFoundError:
+            pass    # No singletons survived filtering for this mate
+        new_filename = os.path.join(input_dir, sample+"_R"+read+".fastq")
+        os.replace(os.path.join(input_dir, sample+"_"+read+".fastq"), new_filename)
+        filenames["R"+read] = new_filename
     
     # If we are in compressed mode we need to compress the outputs
     if compressed_mode:
         for key, value in filenames.items():
             arguments = ["gzip", value, "-c"]
-            call(arguments, stdout=open(value+".gz", 'w'))
+            with open(value+".gz", 'w') as gz_file:
+                call(arguments, stdout=gz_file)
     return filenames
 
 def kraken_call(db_file, output_file, fw_file, rv_file=None, threads=None):
@@ -140,7 +157,7 @@ def kraken_call(db_file, output_file, fw_file, rv_file=None, threads=None):
     if threads:
         arguments.extend(["--threads", str(threads)])
 
-    call(arguments)
+    run(arguments, check=True)
 
     # Get genus and species from kraken output file
     kraken_report_columns = ["Percentage", "Reads_clade_covered", "Reads_clade_assigned", "TaxRank", "NCBI_taxID", "Scientific_name"]
@@ -196,7 +213,7 @@ def flash_call(input_file_1, input_file_2, output_filename, output_dir, threads=
 
     if threads:
         arguments.extend(["--threads", str(threads)])
-    return call(arguments)
+    return run(arguments, check=True).returncode
 
 
 def spades_call(forward_sample, reverse_sample, sample, out_dir, merged_sample=None, threads=None):
@@ -225,7 +242,7 @@ def spades_call(forward_sample, reverse_sample, sample, out_dir, merged_sample=N
     if threads:
         arguments.extend(["--threads", str(threads)])
 
-    return call(arguments)
+    return run(arguments, check=True).returncode
 
 
 def mauve_call(output_folder, reference_sequence, input_contigs, sample_basename):
@@ -242,8 +259,8 @@ def mauve_call(output_folder, reference_sequence, input_contigs, sample_basename
     Returns:
         {string} -- Mauve reordered contigs file path
     """
-    arguments = ["MauveCM", "-output", output_folder+"/"+sample_basename, "-ref", reference_sequence, "-draft", input_contigs]    
-    call(arguments)
+    arguments = ["MauveCM", "-output", output_folder+"/"+sample_basename, "-ref", reference_sequence, "-draft", input_contigs]
+    run(arguments, check=True)
 
     # Here we take the fasta file from the last iteration folder.
     contigs_basename = os.path.basename(input_contigs).split(".")[0]   # Mauve names it's output files after the input file basename
@@ -267,14 +284,14 @@ def shorten_loci(original_file):
     """
     corrected_file = original_file+".tmp"
     with open(original_file) as original, open(corrected_file, 'w') as corrected:
-        records = SeqIO.parse(original_file, 'fasta')
-        for record in records:
-            original_id = record.id
-            record.id = "_".join(original_id.split("_")[:2])
-            record.description = "_".join(original_id.split("_")[2:])
-            SeqIO.write(record, corrected, 'fasta')
-    os.remove(original_file)
-    shutil.move(corrected_file, original_file)
+        for title, seq in SimpleFastaParser(original):
+            original_id = title.split()[0]
+            new_id = "_".join(original_id.split("_")[:2])
+            description = "_".join(original_id.split("_")[2:])
+            header = new_id+" "+description if description else new_id
+            corrected.write(">"+header+"\n"+seq+"\n")
+    # Same directory, same filesystem: a single atomic rename replaces the original
+    os.replace(corrected_file, original_file)
 
 def snippy_call(reference_genome, contigs, output_dir, prefix, threads=None):
     """
@@ -294,7 +311,7 @@ def snippy_call(reference_genome, contigs, output_dir, prefix, threads=None):
     if threads:
         arguments.extend(["--cpus", str(threads)])
 
-    return call(arguments)
+    return run(arguments, check=True).returncode
 
 
 def snippy_summary(snippy_files, output_file):
@@ -333,6 +350,22 @@ def snippy_summary(snippy_files, output_file):
         summary_df.to_csv(output_file, sep="\t",index=False)
 
 
+def _smart_open(path):
+    """
+    Opens a (possibly gzipped) text file, sniffing the gzip magic bytes so both
+    plain and compressed fasta files are read transparently.
+
+    Arguments:
+        path {string} -- File to open.
+
+    Returns:
+        {file} -- Text-mode file handle.
+    """
+    with open(path, 'rb') as f:
+        magic = f.read(2)
+    return gzip.open(path, 'rt') if magic == b'\x1f\x8b' else open(path, 'rt')
+
+
 def contigs_trim_and_rename(contigs_file, output_filename, output_dir, min_len):
     """
     Creates new fasta file filtering sequences shorter than min_len and shortening sequence identifiers.
@@ -346,13 +379,14 @@ def contigs_trim_and_rename(contigs_file, output_filename, output_dir, min_len):
     with open(output_dir+"/Min_contig_len_"+str(min_len)+".txt", 'w') as f:
         f.write("Minimum contig length was set to "+str(min_len))
 
-    large_sequences = []
-    for record in SeqIO.parse(contigs_file, "fasta"):
-        if len(record.seq) >= min_len:
-            record.id = "C_"+"_".join(record.id.split("_")[1:4])
-            record.description = ""
-            large_sequences.append(record)
-    SeqIO.write(large_sequences, output_dir+"/"+output_filename, "fasta")
+    # SimpleFastaParser only yields (title, sequence) strings, skipping the
+    # SeqRecord machinery we don't need for a length filter and an id rewrite.
+    # A 1 MiB output buffer batches the per-record writes into few syscalls.
+    with _smart_open(contigs_file) as in_file, open(output_dir+"/"+output_filename, 'w', buffering=1<<20) as out_file:
+        for title, seq in SimpleFastaParser(in_file):
+            if len(seq) >= min_len:
+                new_id = "C_"+"_".join(title.split()[0].split("_")[1:4])
+                out_file.write(">"+new_id+"\n"+seq+"\n")
 
 
 def get_reads_length(input_file):
@@ -383,9 +417,7 @@ def quast_call(input_file, output_dir, min_contig_len, threads=None):
     if threads:
         arguments.extend(["--threads", str(threads)])
 
-    state = call(arguments)
-
-    return state
+    return run(arguments, check=True).returncode
 
 
 def quast_report_unification(input_dir, samples, output_dir):
@@ -403,36 +435,40 @@ def quast_report_unification(input_dir, samples, output_dir):
     final_df.to_csv(output_dir+"/quality_assembly_report.tsv", sep="\t")
 
 
-def mlst_call(input_dir, reference_file, output_dir, output_filename, threads=None):
+def mlst_call(input_dir, reference_file, output_dir, output_filename, mincov=False, minid=False, threads=None, input_filenames=None):
     """
     MLST call for every fasta file in input_dir.
-    
+
     Arguments:
         input_dir {string} -- Input directory containing contig files.
         reference_file {string} -- Reference file directory.
         output_dir {string} -- Output directory.
         output_filename {string} -- Output file name (and route).
-    
+
+    Keyword Arguments:
+        input_filenames {list} -- Precomputed contig file listing; input_dir is only
+                                  scanned when this is not provided.
+
     Returns:
         {int} -- Execution state (0 if everything is all right)
     """
-    
-    output_file = open(output_dir+"/"+output_filename, "w")
-    
-    input_filenames = []
 
-    for _root, _dirs, files in os.walk(input_dir):
-        for filename in files:
-            if filename.endswith(".fasta"):
-                input_filenames.append(input_dir+"/"+filename)
-    input_filenames.append(reference_file)
-    arguments = ["mlst", *input_filenames]
+    if input_filenames is None:
+        # The contigs directory is flat; glob filters it in a single C-level pass
+        input_filenames = sorted(glob.glob(os.path.join(input_dir, "*.fasta")))
+    input_filenames = [*input_filenames, reference_file]
+    arguments = ["mlst"]
 
+    if mincov:
+        arguments.extend(["--mincov", str(mincov)])
+    if minid:
+        arguments.extend(["--minid", str(minid)])
     if threads:
         arguments.extend(["--threads", str(threads)])
+    arguments.extend(input_filenames)
 
-    status = call(arguments, stdout=output_file)
-    output_file.close()
+    with open(output_dir+"/"+output_filename, "w") as output_file:
+        status = call(arguments, stdout=output_file)
 
     # Reformat output with header
     mlst_data = pd.read_csv(output_dir+"/"+output_filename, sep="\t", header=None)
@@ -448,6 +484,11 @@ def mlst_call(input_dir, reference_file, output_dir, output_filename, threads=No
 
 
 def mlst_postprocessing(mlst_file, output_file):
+    # Imported lazily: only this optional step (MLST include_cc) needs network
+    # access, so the rest of the pipeline starts without paying for requests
+    import requests
+    from io import StringIO
+
     col_names = ["Sample", "Genus", "ST"]
     output_data = pd.DataFrame()
     mlst_df = pd.read_csv(mlst_file, delimiter="\t")
@@ -489,29 +530,30 @@ def mlst_postprocessing(mlst_file, output_file):
     output_data.to_csv(output_file, index=False, sep="\t")
 
 
-def abricate_call(input_dir, output_dir, output_filename, database, mincov=False, minid=False, gene_matrix_file=False, samples=False, threads=None):
+def abricate_call(input_dir, output_dir, output_filename, database, mincov=False, minid=False, gene_matrix_file=False, samples=False, threads=None, input_filenames=None):
     """
     ABRicate call.
-    
+
     Arguments:
         input_dir {string} -- Input directory containing contig files.
         output_dir {string} -- Output directory.
         output_filename {string} -- Output file name (and route).
         database {string} -- Database name.
-    
+
+    Keyword Arguments:
+        input_filenames {list} -- Precomputed contig file listing; input_dir is only
+                                  scanned when this is not provided.
+
     Returns:
         {int} -- Execution state (0 if everything is all right)
     """
     tmp_file = output_dir+"/tmp_"+output_filename
     output_file = output_dir+"/"+output_filename
     output_matrix = output_dir+"/"+gene_matrix_file
-    
-    input_filenames = []
 
-    for _root, _dirs, files in os.walk(input_dir):
-        for filename in files:
-            if filename.endswith(".fasta"):
-                input_filenames.append(input_dir+"/"+filename)
+    if input_filenames is None:
+        # The contigs directory is flat; glob filters it in a single C-level pass
+        input_filenames = sorted(glob.glob(os.path.join(input_dir, "*.fasta")))
 
     arguments = ["abricate", *input_filenames, "--db", database]
     
@@ -718,36 +760,34 @@ def blast_call(proteins_file_ori, proteins_file_dest, contigs_files_paths, blast
     shutil.copy(proteins_file_ori, proteins_file_dest)
 
     # Concat every contig from Mauve on DNA_database.fna (replacing sequences names)
-    with open(blast_database_output, "w") as output_file:
+    with open(blast_database_output, "w", buffering=1<<20) as output_file:
         for contig_file_path in contigs_files_paths:
-            for record in SeqIO.parse(contig_file_path, "fasta"):
-                strain = os.path.basename(contig_file_path).split(".")[0]
-                record.id = record.name = record.description = strain+"_C_"+"_".join(record.id.split("_")[1:])
-                SeqIO.write(record, output_file, "fasta")
+            strain = os.path.basename(contig_file_path).split(".")[0]
+            with open(contig_file_path) as contig_file:
+                for title, seq in SimpleFastaParser(contig_file):
+                    new_id = strain+"_C_"+"_".join(title.split()[0].split("_")[1:])
+                    output_file.write(">"+new_id+"\n"+seq+"\n")
                 
     # Create blast database
-    blast_db_path = os.path.dirname(os.path.abspath(blast_database_output))+"/DNA_database"
-    call(["makeblastdb", "-in", blast_database_output, "-dbtype", "nucl", 
+    blast_db_path = os.path.join(os.path.dirname(os.path.abspath(blast_database_output)), "DNA_database")
+    call(["makeblastdb", "-in", blast_database_output, "-dbtype", "nucl",
           "-out", blast_db_path, "-title", "DNA_Database"])
 
-    # Call tblastn
+    # Call tblastn, streaming its stdout into the output file right after the
+    # header line, so the (potentially huge) table never gets rewritten
+    blast_output_path = os.path.join(blast_output_folder, blast_output_name)
     arguments = ["tblastn", "-db", blast_db_path, "-query", proteins_file_dest,
                 "-soft_masking", str(cfg.config["virulence_genes"]["blast"]["soft_masking"]).lower(),
-                "-outfmt", "6 qseqid sseqid pident length mismatch gapopen qstart qend sstart send evalue bitscore sseq",
-                "-out", blast_output_folder+"/"+blast_output_name]
+                "-outfmt", "6 qseqid sseqid pident length mismatch gapopen qstart qend sstart send evalue bitscore sseq"]
     if threads:
         arguments.extend(["-num_threads", str(threads)])
 
-    tblastn_state = call(arguments)
-
-    # Add header to tblastn output
-    with open(blast_output_folder+"/"+blast_output_name, 'r+') as f:
-        content = f.read()
-        f.seek(0, 0)
-        headers = ["query id", "subject id", "% identity", "alignment length", "mismatches", "gap opens", 
-                   "query start", "query end", "subject start", "subject end", "evalue", "score", "aligned part of subject sequence"]
-
-        f.write("\t".join(headers) + '\n' + content)
+    headers = ["query id", "subject id", "% identity", "alignment length", "mismatches", "gap opens",
+               "query start", "query end", "subject start", "subject end", "evalue", "score", "aligned part of subject sequence"]
+    with open(blast_output_path, 'w') as f:
+        f.write("\t".join(headers) + '\n')
+        f.flush()
+        tblastn_state = call(arguments, stdout=f)
 
     return tblastn_state
 
@@ -763,32 +803,37 @@ def blast_postprocessing(blast_file, database_file, output_folder, samples):
         samples {[string]} -- List of samples names.
     """
     
-    # Read blast file as dataframe
-    blast_output = pd.read_csv(blast_file, sep="\t")
-
-    # Remove low identity rows 
-    blast_output = blast_output[blast_output["% identity"] > 50]
-
-    # Add query length and protein cover % columns
-    blast_output.insert(2, "query length", "")
-    blast_output.insert(3, "protein cover %", "")
-    
-    # Parse fasta database into dict
-    proteins_database = {}
-    for record in SeqIO.parse(database_file, "fasta"):
-        proteins_database[record.id] = (record.description, record.seq)
-    
-    # Fill query length and protein cover % columns
-    for index, row in blast_output.iterrows():
-        query_id = row["query id"]
-        query_length = len(proteins_database[query_id][1])
-        blast_output.at[index, "query length"] = query_length
-
-        # (query end - query start + 1) / query length * 100
-        query_end = row["query end"]
-        query_start = row["query start"]
-        protein_cover = (query_end - query_start + 1) / query_length * 100
-        blast_output.at[index, "protein cover %"] = protein_cover
+    # Read blast file as dataframe in chunks, dropping the low identity rows per
+    # chunk so the discarded majority of a large tblastn table never accumulates
+    # in memory; the dtype hints skip pandas' type inference pass
+    dtypes = {  "% identity": "float32",
+                "alignment length": "int32",
+                "mismatches": "int32",
+                "gap opens": "int32",
+                "query start": "int32",
+                "query end": "int32",
+                "subject start": "int32",
+                "subject end": "int32",
+                "score": "float32"}
+    blast_output = pd.concat([chunk[chunk["% identity"] > 50]
+                              for chunk in pd.read_csv(blast_file, sep="\t", dtype=dtypes, chunksize=200000)],
+                             ignore_index=True)
+
+    # Parse the fasta database once: only the protein length and type are used,
+    # so keep those instead of whole sequences
+    proteins_lengths = {}
+    proteins_dict = {}
+    with open(database_file) as database:
+        for title, seq in SimpleFastaParser(database):
+            protein_id = title.split()[0]
+            proteins_lengths[protein_id] = len(seq)
+            proteins_dict[protein_id] = title.split()[1]
+
+    # Add query length and protein cover % columns (vectorized, no per-row loop)
+    query_length = blast_output["query id"].map(proteins_lengths)
+    blast_output.insert(2, "query length", query_length)
+    # (query end - query start + 1) / query length * 100
+    blast_output.insert(3, "protein cover %", (blast_output["query end"] - blast_output["query start"] + 1) / query_length * 100)
 
     # Split subject_id column
     blast_output[["Sample", "Contig sample"]] = blast_output["subject id"].str.split("_", 1, expand=True)
@@ -812,10 +857,7 @@ def blast_postprocessing(blast_file, database_file, output_folder, samples):
                                 inplace=True)
 
     # Add protein type column
-    proteins_dict = {}
-    for record in SeqIO.parse(database_file, "fasta"):
-        proteins_dict[record.id] = record.description.split()[1]
-    blast_output["Protein type"] = blast_output.apply (lambda row: proteins_dict[row["Protein"]].lower(), axis=1)
+    blast_output["Protein type"] = blast_output["Protein"].map(proteins_dict).str.lower()
 
     # Sort columns
     new_columns = [ "Protein",
@@ -837,8 +879,8 @@ def blast_postprocessing(blast_file, database_file, output_folder, samples):
                     "Aligned part of subject sequence"]
     
     blast_output = blast_output[new_columns]
-    blast_output['% protein cover'] = blast_output['% protein cover'].apply(lambda x: round(x, 2))
-    blast_output['% protein identity'] = blast_output['% protein identity'].apply(lambda x: round(x, 2))
+    blast_output['% protein cover'] = blast_output['% protein cover'].round(2)
+    blast_output['% protein identity'] = blast_output['% protein identity'].round(2)
 
     # Sort rows
     blast_output = blast_output.sort_values(by=["Protein type", "Protein", "Sample"])
@@ -942,7 +984,7 @@ def prokka_call(locus_tag, output_dir, prefix, input_file, genus, species, strai
     if threads:
         arguments.extend(["--cpus", str(threads)])
 
-    return call(arguments)
+    return run(arguments, check=True).returncode
 
 
 def prokka_summary(prokka_files, output_file):
@@ -1023,26 +1065,30 @@ def dfast_call(locus_tag, contigs_file, output_dir, sample_basename, organism, t
     if threads:
         arguments.extend(["--cpu", str(threads)])
 
-    state = call(arguments)
-
-    # Replace default output filenames including string basename
-    for root, _dirs, files in os.walk(output_dir):
-        for filename in files:
-            if filename.__contains__("genome"):
-                new_filename = filename.replace("genome", sample_basename)
-                shutil.move(os.path.join(root, filename), os.path.join(root, new_filename))
-            elif filename.__contains__("cds"):
-                new_filename = filename.replace("cds", sample_basename+"_cds")
-                shutil.move(os.path.join(root, filename), os.path.join(root, new_filename))
-            elif filename.__contains__("protein"):
-                new_filename = filename.replace("protein", sample_basename)
-                shutil.move(os.path.join(root, filename), os.path.join(root, new_filename))
-            elif filename.__contains__("rna"):
-                new_filename = filename.replace("rna", sample_basename+"_rna")
-                shutil.move(os.path.join(root, filename), os.path.join(root, new_filename))
-            elif filename.__contains__("statistics"):
-                new_filename = filename.replace("statistics", sample_basename+"_statistics")
-                shutil.move(os.path.join(root, filename), os.path.join(root, new_filename))
+    state = run(arguments, check=True).returncode
+
+    # Replace default output filenames including string basename (dfast writes a
+    # flat output directory, so a single scandir pass is enough)
+    for entry in list(os.scandir(output_dir)):
+        if entry.is_file():
+            root, filename = output_dir, entry.name
+            # replace(..., 1) stops at the first occurrence, which also keeps the
+            # rename stable if the sample basename itself contains one of the keys
+            if "genome" in filename:
+                new_filename = filename.replace("genome", sample_basename, 1)
+                os.replace(os.path.join(root, filename), os.path.join(root, new_filename))
+            elif "cds" in filename:
+                new_filename = filename.replace("cds", sample_basename+"_cds", 1)
+                os.replace(os.path.join(root, filename), os.path.join(root, new_filename))
+            elif "protein" in filename:
+                new_filename = filename.replace("protein", sample_basename, 1)
+                os.replace(os.path.join(root, filename), os.path.join(root, new_filename))
+            elif "rna" in filename:
+                new_filename = filename.replace("rna", sample_basename+"_rna", 1)
+                os.replace(os.path.join(root, filename), os.path.join(root, new_filename))
+            elif "statistics" in filename:
+                new_filename = filename.replace("statistics", sample_basename+"_statistics", 1)
+                os.replace(os.path.join(root, filename), os.path.join(root, new_filename))
     return state
 
 
@@ -1094,14 +1140,15 @@ def roary_call(input_files, output_dir, campype_output_folder, threads=None):
         arguments.extend(["-p", str(threads)])
 
     ex_state = call(arguments)
-    # Set Roary output directory name
-    for root, dirs, _files in os.walk(campype_output_folder):
-        for dirname in dirs:
-            if dirname.startswith("Roary_pangenome_"):
-                files = os.listdir(root+"/"+dirname)
-                for f in files:
-                    shutil.move(root+"/"+dirname+"/"+f, output_dir)
-                os.rmdir(root+"/"+dirname)
+    # Set Roary output directory name. When output_dir already exists Roary
+    # writes to a suffixed sibling directory, so one scan of the output folder
+    # is enough to find it (no need to walk the whole results tree)
+    for entry in os.scandir(campype_output_folder):
+        if entry.is_dir() and entry.name.startswith("Roary_pangenome_"):
+            for f in os.listdir(entry.path):
+                shutil.move(entry.path+"/"+f, output_dir)
+            os.rmdir(entry.path)
+            break
     return ex_state
 
 
@@ -1121,10 +1168,10 @@ def roary_plots_call(input_newick, input_gene_presence_absence, output_dir):
     arguments = ["python", "utils/roary_plots.py", input_newick, input_gene_presence_absence]
     ex_state = call(arguments)
     
-    # Roary_plots saves output files in the current directory, so we move them to our own
-    for filename in os.listdir("."):
-        # I'm being this specific so we don't move any other similar file
-        if filename.startswith("pangenome_frequency.png") or filename.startswith("pangenome_matrix.png") or filename.startswith("pangenome_pie.png"):
+    # Roary_plots saves its three output files under fixed names in the current
+    # directory, so move them by name instead of scanning the whole directory
+    for filename in ("pangenome_frequency.png", "pangenome_matrix.png", "pangenome_pie.png"):
+        if os.path.exists(filename):
             shutil.move("./"+filename, output_dir+"/"+filename)
     return ex_state
 
@@ -1151,8 +1198,8 @@ def get_reads_table(input1, input2, sample_name, output, after_qc=False):
                 "-stats_info", 
                 "-stats_len"]
     
-    # Write in a bypass file prinseq-lite result
-    bypass = "bypass.tsv"
+    # Write in a bypass file prinseq-lite result (one per sample so parallel samples don't clash)
+    bypass = "bypass_"+sample_name+".tsv"
     with open(bypass, "w") as f:
         call(arguments, stdout=f)
     call(["cat", bypass])
@@ -1161,15 +1208,8 @@ def get_reads_table(input1, input2, sample_name, output, after_qc=False):
     with open(bypass, "r") as bypass_file:
         data = csv.reader(bypass_file, delimiter="\t")
 
-        if not os.path.isfile(output):
-            with open(output, "w") as out_file:
-                outputwriter = csv.writer(out_file, delimiter="\t")
-                if after_qc:
-                    outputwriter.writerow(["Sample", "R1ReadsQC", "R1LenMeanQC", "R1LenSdQC", "R2ReadsQC", "R2LenMeanQC", "R2LenSdQC"])
-                else:
-                    outputwriter.writerow(["Sample", "R1Reads", "R1LenMean", "R1LenSd", "R2Reads", "R2LenMean", "R2LenSd"])
-                
-        
+        # The header is written once in __main__ before the sample pool starts;
+        # appending here keeps concurrent samples from truncating each other
         with open(output, "a") as out_file:
             outputwriter = csv.writer(out_file, delimiter="\t")
             data_dict = {}
@@ -1214,8 +1254,8 @@ def get_flash_reads_table(extended, notcombined1, notcombined2, sample_name, out
         {dict} -- Dictionary with reads information.
     """
         
-    # Write in a bypass file prinseq-lite result
-    bypass1 = "bypass1.tsv"
+    # Write in a bypass file prinseq-lite result (one per sample so parallel samples don't clash)
+    bypass1 = "bypass1_"+sample_name+".tsv"
     with open(bypass1, "w") as f:
         arguments = ["prinseq-lite.pl", 
                 "-fastq", extended, 
@@ -1224,7 +1264,7 @@ def get_flash_reads_table(extended, notcombined1, notcombined2, sample_name, out
         call(arguments, stdout=f)
     call(["cat", bypass1])
 
-    bypass2 = "bypass2.tsv"
+    bypass2 = "bypass2_"+sample_name+".tsv"
     with open(bypass2, "w") as f:
         arguments = ["prinseq-lite.pl", 
                 "-fastq", notcombined1, 
@@ -1240,12 +1280,8 @@ def get_flash_reads_table(extended, notcombined1, notcombined2, sample_name, out
             data1 = csv.reader(bypass_file1, delimiter="\t")
             data2 = csv.reader(bypass_file2, delimiter="\t")
 
-            if not os.path.isfile(output):
-                with open(output, "w") as out_file:
-                    outputwriter = csv.writer(out_file, delimiter="\t")
-                    outputwriter.writerow(["Sample", "JoinReads (%)", "JoinReads", "JoinLenMeanReads", "JoinLenSdReads", "UnjoinR1Reads", "UnjoinR1LenMeanReads", "UnjoinR1LenSdReads", "UnjoinR2Reads", "UnjoinR2LenMeanReads", "UnjoinR2LenSdReads"])
-                    
-            
+            # The header is written once in __main__ before the sample pool starts;
+            # appending here keeps concurrent samples from truncating each other
             with open(output, "a") as out_file:
                 outputwriter = csv.writer(out_file, delimiter="\t")
                 data_dict = {}
@@ -1392,13 +1428,13 @@ def generate_report(samples, prinseq_dir, assembly_dir, annotation_dir, mauve_di
                     reads = info_pre_QC[sample]["R1Reads"] + info_pre_QC[sample]["R2Reads"]
                     
                     # "ReadLen": Average read length (bp) before quality control.
-                    readlen = np.mean([info_pre_QC[sample]["R1LenMean"], info_pre_QC[sample]["R2LenMean"]])
+                    readlen = (info_pre_QC[sample]["R1LenMean"] + info_pre_QC[sample]["R2LenMean"]) / 2
 
                     # "ReadsQC": Total number of reads after quality control.
                     readsqc = info_post_QC[sample]["R1Reads"] + info_post_QC[sample]["R2Reads"]
 
                     # "ReadsQCLen": Average read length (bp) after quality control.
-                    readsqclen = np.mean([info_post_QC[sample]["R1LenMean"], info_post_QC[sample]["R2LenMean"]])
+                    readsqclen = (info_post_QC[sample]["R1LenMean"] + info_post_QC[sample]["R2LenMean"]) / 2
                     
                     # "DepthCov (X)": Number of times each nucleotide position in the draft genome has a read that align to that position.
                     depthcov = round((info_post_QC[sample]["R1Reads"] * info_post_QC[sample]["R1LenMean"] + info_post_QC[sample]["R2Reads"] * info_post_QC[sample]["R2LenMean"])/ genome_len, 0)
@@ -1605,6 +1641,361 @@ def generate_report(samples, prinseq_dir, assembly_dir, annotation_dir, mauve_di
     csv_report.to_csv(out_dir+"/campype_report.csv", sep="\t", index=False)
 
 
+def run_sample(sample_basename, data, sample_counter, n_samples, context):
+    """
+    Runs the whole per-sample workflow (quality filtering, species identification,
+    assembly, annotation and variant calling) for a single sample. Samples are
+    independent (every step writes inside per-sample directories), so this function
+    can be dispatched across a process pool.
+
+    Arguments:
+        sample_basename {string} -- Sample basename.
+        data {dict} -- Input files information for this sample (FW, RV, Genus, Species).
+        sample_counter {int} -- Number of this sample in the workflow (just for logging).
+        n_samples {int} -- Total number of samples.
+        context {dict} -- Shared workflow information (output directories, reference files and mode flags).
+
+    Returns:
+        {dict} -- Per-sample results to be aggregated once every sample has finished.
+    """
+    output_folder = context["output_folder"]
+    trimmomatic_dir = context["trimmomatic_dir"]
+    prinseq_dir = context["prinseq_dir"]
+    kraken_dir = context["kraken_dir"]
+    flash_dir = context["flash_dir"]
+    spades_dir = context["spades_dir"]
+    contigs_dir = context["contigs_dir"]
+    mauve_dir = context["mauve_dir"]
+    snps_dir = context["snps_dir"]
+    dfast_dir = context["dfast_dir"]
+    prokka_dir = context["prokka_dir"]
+    dfast_refactor_dir = context["dfast_refactor_dir"]
+    prokka_refactor_dir = context["prokka_refactor_dir"]
+    roary_input_dir = context["roary_input_dir"]
+    adapters_file = context["adapters_file"]
+    reference_genome_file = context["reference_genome_file"]
+    fasta_mode = context["fasta_mode"]
+    annotator = context["annotator"]
+    compressed_mode = context["compressed_mode"]
+    n_threads = context["n_threads"]
+
+    sample_fw = data["FW"]
+    sample_rv = data["RV"]
+    genus = data["Genus"]
+    species = data["Species"]
+
+    # Frequently reused per-sample paths, computed once
+    sample_prinseq_dir = prinseq_dir+"/"+sample_basename
+    sample_flash_dir = flash_dir+"/"+sample_basename
+    sample_spades_dir = spades_dir+"/"+sample_basename
+    sample_contigs_file = contigs_dir+"/"+sample_basename+".fasta"
+
+    result = {  "sample": sample_basename,
+                "genus": genus,
+                "species": species,
+                "kraken_report": None,
+                "report_pre_qc": None,
+                "report_post_qc": None,
+                "report_post_flash": None,
+                "roary_input_file": None,
+                "snippy_output_file": None,
+                "steps": 1}
+
+    step_counter = 1 # Just to let the user know the number of each step
+
+    print(f"Sample {sample_counter}/{n_samples} ({sample_basename}): workflow started", flush=True)
+
+    stream_to_prinseq = False
+    if not fasta_mode:
+        # Run trimmomatic or not
+        if cfg.config["trim_adaptors"]["run_trim_adaptors"]:
+
+            trim_r1_paired = trimmomatic_dir+"/"+sample_basename+"_R1_paired.fastq"
+            trim_r2_paired = trimmomatic_dir+"/"+sample_basename+"_R2_paired.fastq"
+
+            # Optionally stream the paired outputs straight into Prinseq through named
+            # pipes, so the largest intermediate FASTQs of the pipeline never hit the disk
+            stream_to_prinseq = cfg.config["trim_adaptors"].get("stream_to_prinseq", False)
+            if stream_to_prinseq:
+                os.mkfifo(trim_r1_paired)
+                os.mkfifo(trim_r2_paired)
+
+            print(Banner(f"\nStep {step_counter} for sequence {sample_counter}/{n_samples} ({sample_basename}): Trimmomatic\n"), flush=True)
+            trimmomatic_process = trimmomatic_call(input_file1=sample_fw,
+                            input_file2=sample_rv,
+                            phred="-phred33",
+                            trimfile="ILLUMINACLIP:"+adapters_file+":1:30:11",
+                            paired_out_file1=trim_r1_paired,
+                            unpaired_out_file1=trimmomatic_dir+"/"+sample_basename+"_R1_unpaired.fastq.gz",
+                            paired_out_file2=trim_r2_paired,
+                            unpaired_out_file2=trimmomatic_dir+"/"+sample_basename+"_R2_unpaired.fastq.gz",
+                            threads = n_threads,
+                            background=stream_to_prinseq)
+            step_counter += 1
+            prinseq_input1 = trim_r1_paired
+            prinseq_input2 = trim_r2_paired
+        else:
+            prinseq_input1 = context["decompressed_samples_fw"][sample_basename]
+            prinseq_input2 = context["decompressed_samples_rv"][sample_basename]
+
+
+        # Create prinseq output directories
+        os.makedirs(sample_prinseq_dir, exist_ok=True)
+
+        if stream_to_prinseq:
+            # Fail fast if Trimmomatic already died (bad arguments, missing
+            # input, JVM startup failure): Prinseq would otherwise block forever
+            # opening a FIFO that will never get a writer. A healthy Trimmomatic
+            # cannot have exited yet, since its first pipe write blocks until
+            # Prinseq opens the read end, so any early exit is an error
+            returncode = trimmomatic_process.poll()
+            if returncode is not None:
+                os.remove(trim_r1_paired)
+                os.remove(trim_r2_paired)
+                raise CalledProcessError(returncode or 1, trimmomatic_process.args)
+
+        # Prinseq call
+        print(Banner(f"\nStep {step_counter} for sequence {sample_counter}/{n_samples} ({sample_basename}): Prinseq\n"), flush=True)
+        try:
+            prinseq_call(input_file1=prinseq_input1,
+                        input_file2=prinseq_input2,
+                        output_folder=sample_prinseq_dir,
+                        sample=sample_basename,
+                        log_name=sample_prinseq_dir+"/"+sample_basename+".log")
+        except Exception:
+            if stream_to_prinseq:
+                # If Prinseq dies, Trimmomatic is left blocked writing to a pipe
+                # with no reader; kill it and drop the FIFOs before surfacing
+                # the error so a failed sample cannot leak a hung process
+                trimmomatic_process.kill()
+                trimmomatic_process.wait()
+                os.remove(trim_r1_paired)
+                os.remove(trim_r2_paired)
+            raise
+        step_counter += 1
+
+        if stream_to_prinseq:
+            # Trimmomatic finishes as soon as Prinseq has drained the pipes
+            returncode = trimmomatic_process.wait()
+            os.remove(trim_r1_paired)
+            os.remove(trim_r2_paired)
+            if returncode != 0:
+                raise CalledProcessError(returncode, trimmomatic_process.args)
+
+        # Prinseq output files refactor
+        print("\nRefactoring prinseq output files\n", flush=True)
+        prinseq_files = refactor_prinseq_output(sample_prinseq_dir, sample_basename, compressed_mode)
+
+        # Kraken call
+        if cfg.config["species_identification"]["run_species_identification"]:
+            print(Banner(f"\nStep {step_counter} for sequence {sample_counter}/{n_samples} ({sample_basename}): Kraken\n"), flush=True)
+
+            kraken_db_file = cfg.config["species_identification"]["species_identification_database"]
+
+            # Check if database exists
+            if not os.path.exists(kraken_db_file):
+                print("ERROR: Kraken database file does not exist.", flush=True)
+                sys.exit(1)
+            kraken_out_report_file = kraken_dir+"/"+sample_basename+".tab"
+            kraken_genus, kraken_species = kraken_call(db_file=kraken_db_file,
+                                                       output_file=kraken_out_report_file,
+                                                       fw_file=prinseq_files["R1"],
+                                                       rv_file=prinseq_files["R2"],
+                                                       threads = n_threads)
+            result["kraken_report"] = kraken_out_report_file
+            if not genus or not species:
+                genus = result["genus"] = kraken_genus
+                species = result["species"] = kraken_species
+            step_counter += 1
+
+
+        # Flash call
+        if cfg.config["merge_reads"]:
+            print(Banner(f"\nStep {step_counter} for sequence {sample_counter}/{n_samples} ({sample_basename}): Flash\n"), flush=True)
+            flash_call(input_file_1=prinseq_files["R1"],
+                    input_file_2=prinseq_files["R2"],
+                    output_filename=sample_basename,
+                    output_dir=sample_flash_dir,
+                    threads = n_threads)
+            step_counter += 1
+
+        # Quality reports
+        print(Banner(f"\nStep {step_counter} for sequence {sample_counter}/{n_samples} ({sample_basename}): Read statistics\n"), flush=True)
+        step_counter += 1
+
+        result["report_pre_qc"] = get_reads_table(context["decompressed_samples_fw"][sample_basename], context["decompressed_samples_rv"][sample_basename], sample_basename, prinseq_dir+"/reads_statistics_beforeQC.tsv", False)
+
+        result["report_post_qc"] = get_reads_table(prinseq_files["R1"], prinseq_files["R2"], sample_basename, prinseq_dir+"/reads_statistics_afterQC.tsv", True)
+        if cfg.config["merge_reads"]:
+            result["report_post_flash"] = get_flash_reads_table(sample_flash_dir+"/"+sample_basename+".extendedFrags.fastq",
+                                sample_flash_dir+"/"+sample_basename+".notCombined_1.fastq",
+                                sample_flash_dir+"/"+sample_basename+".notCombined_2.fastq",
+                                sample_basename, flash_dir+"/reads_statistics_FLASH.tsv", result["report_post_qc"])
+
+        # Create SPAdes output directories
+        os.makedirs(sample_spades_dir, exist_ok=True)
+
+        # SPAdes call
+        print(Banner(f"\nStep {step_counter} for sequence {sample_counter}/{n_samples} ({sample_basename}): SPAdes\n"), flush=True)
+        if cfg.config["merge_reads"]:
+            spades_call(forward_sample=sample_flash_dir+"/"+sample_basename+".notCombined_1.fastq",
+                        reverse_sample=sample_flash_dir+"/"+sample_basename+".notCombined_2.fastq",
+                        sample=sample_basename,
+                        out_dir=spades_dir,
+                        merged_sample=sample_flash_dir+"/"+sample_basename+".extendedFrags.fastq",
+                        threads = n_threads)
+        else:
+            spades_call(forward_sample=sample_prinseq_dir+"/"+sample_basename+"_R1.fastq",
+                        reverse_sample=sample_prinseq_dir+"/"+sample_basename+"_R2.fastq",
+                        sample=sample_basename,
+                        out_dir=spades_dir,
+                        threads = n_threads)
+        step_counter += 1
+
+        # Get minimum contig length
+        # min_contig_threshold = get_reads_length(prinseq_dir+"/"+sample_basename+"/"+sample_basename+"_R1.fastq") * 2
+        min_contig_threshold = cfg.config["min_contig_len"]
+
+        # Trim short contigs and shorten sequences id
+        contigs_trim_and_rename(contigs_file=sample_spades_dir+"/"+"contigs.fasta",
+                                output_filename=sample_basename+".fasta",
+                                output_dir=contigs_dir,
+                                min_len=min_contig_threshold)
+        sample_contigs = sample_contigs_file
+    else:
+        min_contig_threshold = cfg.config["min_contig_len"]
+        # If in fasta mode, we just skip everything until this point
+        if compressed_mode:
+            sample_contigs = context["decompressed_samples"][sample_basename]
+        else:
+            sample_contigs = data["FW"]
+
+        # Kraken call
+        if cfg.config["species_identification"]["run_species_identification"]:
+            print(Banner(f"\nStep {step_counter} for sequence {sample_counter}/{n_samples} ({sample_basename}): Kraken\n"), flush=True)
+
+            kraken_db_file = "./db/minikraken-DB/minikraken_8GB_20200312"
+
+            # Check if database exists
+            if not os.path.exists(kraken_db_file):
+                print("ERROR: Kraken database file does not exist.", flush=True)
+                sys.exit(1)
+
+            kraken_out_report_file = kraken_dir+"/"+sample_basename+".tab"
+            kraken_genus, kraken_species = kraken_call(db_file=kraken_db_file,
+                                                       output_file=kraken_out_report_file,
+                                                       fw_file=sample_fw,
+                                                       threads = n_threads)
+            if not genus or not species:
+                genus = result["genus"] = kraken_genus
+                species = result["species"] = kraken_species
+            result["kraken_report"] = kraken_out_report_file
+            step_counter += 1
+
+    # Reordering contigs by a reference genome with MauveCM
+    if cfg.config["reference_genome"]["file"]:
+        print(Banner(f"\nStep {step_counter} for sequence {sample_counter}/{n_samples} ({sample_basename}): reordering {sample_basename} genome against reference genome\n"), flush=True)
+        draft_contigs = mauve_call(output_folder=mauve_dir,
+                                    reference_sequence=reference_genome_file,
+                                    input_contigs=sample_contigs,
+                                    sample_basename=sample_basename)
+        step_counter += 1
+    else:
+        if fasta_mode:
+            draft_contigs = sample_contigs
+            # Copy contigs to contigs_dir
+            shutil.copyfile(draft_contigs, sample_contigs_file)
+        else:
+            draft_contigs = sample_contigs_file
+
+
+    # Create Quast output directories
+    quast_sample_dir = sample_basename+"_assembly_statistics"
+    if fasta_mode: # In fasta mode the Spades directory does not exist
+        quast_dir = output_folder+"/Quast/"
+        assembly_dir = quast_dir
+        os.makedirs(assembly_dir+quast_sample_dir, exist_ok=True)
+    else:
+        assembly_dir = spades_dir
+        quast_dir = assembly_dir+"/"+sample_basename+"/"
+        os.makedirs(quast_dir+quast_sample_dir, exist_ok=True)
+
+
+
+
+    # Quast call
+    print(Banner(f"\nStep {step_counter} for sequence {sample_counter}/{n_samples} ({sample_basename}): Quast\n"), flush=True)
+    quast_call( input_file=draft_contigs,
+                output_dir=assembly_dir+"/"+sample_basename+"/"+quast_sample_dir,
+                min_contig_len=min_contig_threshold,
+                threads = n_threads)
+    step_counter += 1
+
+    if cfg.config["annotation"]["run_annotation"]:
+        # Annotation (Prokka or dfast)
+        if annotator.lower() == "dfast":
+            # Dfast call
+            print(Banner(f"\nStep {step_counter} for sequence {sample_counter}/{n_samples} ({sample_basename}): Dfast\n"), flush=True)
+            dfast_call(locus_tag=sample_basename+"_L",
+                    contigs_file=draft_contigs,
+                    output_dir=dfast_dir+"/"+sample_basename,
+                    sample_basename=sample_basename,
+                    organism=genus+" "+species,
+                threads = n_threads)
+            step_counter += 1
+
+            refactor_gff_from_dfast(dfast_dir+"/"+sample_basename+"/"+sample_basename+".gff",
+                                    dfast_refactor_dir+"/"+sample_basename+".gff",
+                                    roary_input_dir+"/"+sample_basename+".gff")
+            # Set roary input files
+            result["roary_input_file"] = roary_input_dir+"/"+sample_basename+".gff"
+
+        else:
+            # Prokka call
+            print(Banner(f"\nStep {step_counter} for sequence {sample_counter}/{n_samples} ({sample_basename}): Prokka\n"), flush=True)
+            prokka_call(locus_tag=sample_basename+"_L",
+                        output_dir=prokka_dir+"/"+sample_basename,
+                        prefix=sample_basename,
+                        input_file=draft_contigs,
+                        genus=genus,
+                        species=species,
+                        strain=sample_basename,
+                        proteins=cfg.config["reference_genome"]["proteins"],
+                        rawproduct=cfg.config["annotation"]["prokka"]["rawproduct"],
+                        threads = n_threads)
+            step_counter += 1
+            if cfg.config["antimicrobial_resistance_genes"]["run_antimicrobial_resistance_genes_prediction"]:
+                if "amrfinder" in cfg.config["antimicrobial_resistance_genes"]["antimicrobial_resistance_genes_predictor_tool"]:
+                    refactor_gff_from_prokka(prokka_dir+"/"+sample_basename+"/"+sample_basename+".gff", prokka_refactor_dir+"/"+sample_basename+".gff")
+            # Set roary input files
+            result["roary_input_file"] = prokka_dir+"/"+sample_basename+"/"+sample_basename+".gff"
+
+
+    if cfg.config["run_variant_calling"]:
+        print(Banner(f"\nStep {step_counter} for sequence {sample_counter}/{n_samples} ({sample_basename}): SNIPPY\n"), flush=True)
+        if reference_genome_file:
+            # SNPs identification (SNIPPY)
+            step_counter += 1
+            if cfg.config["reference_genome"]["proteins"]:
+                ref_genome = cfg.config["reference_genome"]["proteins"]
+            else:
+                ref_genome = cfg.config["reference_genome"]["file"]
+            snippy_call(reference_genome=ref_genome,
+                        contigs=draft_contigs,
+                        output_dir=snps_dir+"/"+sample_basename,
+                        prefix=sample_basename,
+                        threads = n_threads)
+            result["snippy_output_file"] = snps_dir+"/"+sample_basename+"/"+sample_basename+".txt"
+        else:
+            # We cannot run SNIPPY without a reference genome
+            print("ERROR: You must provide a reference genome to run SNIPPY.", flush=True)
+
+    print(f"Sample {sample_counter}/{n_samples} ({sample_basename}): workflow finished", flush=True)
+
+    result["steps"] = step_counter
+    return result
+
+
 if __name__ == "__main__":
 
     # Welcome
@@ -1863,274 +2254,98 @@ if __name__ == "__main__":
 
     
     # Workflow Starts (for standard samples)
-    sample_counter = 0
     samples_basenames = [] # Keeping track of them
     kraken_reports = []
-    n_samples = len(read_input_files("input_files.csv"))
-
-    for sample_basename, data in read_input_files("input_files.csv").items():
-        
-        sample_fw = data["FW"]
-        sample_rv = data["RV"]
-        samples_genus[sample_basename] = data["Genus"]
-        samples_species[sample_basename] = data["Species"]
-
-        step_counter = 1 # Just to let the user know the number of each step
-        sample_counter += 1
+    samples_data = read_input_files("input_files.csv")
+    n_samples = len(samples_data)
+
+    # Shared workflow information every worker needs to process one sample
+    context = { "output_folder": output_folder,
+                "trimmomatic_dir": trimmomatic_dir,
+                "prinseq_dir": prinseq_dir,
+                "kraken_dir": kraken_dir,
+                "flash_dir": flash_dir,
+                "spades_dir": spades_dir,
+                "contigs_dir": contigs_dir,
+                "mauve_dir": mauve_dir,
+                "snps_dir": snps_dir,
+                "dfast_dir": dfast_dir,
+                "prokka_dir": prokka_dir,
+                "dfast_refactor_dir": dfast_refactor_dir,
+                "prokka_refactor_dir": prokka_refactor_dir,
+                "roary_input_dir": roary_input_dir,
+                "adapters_file": adapters_file,
+                "reference_genome_file": reference_genome_file,
+                "fasta_mode": fasta_mode,
+                "annotator": annotator,
+                "compressed_mode": compressed_mode,
+                "decompressed_samples_fw": decompressed_samples_fw,
+                "decompressed_samples_rv": decompressed_samples_rv,
+                "decompressed_samples": decompressed_samples,
+                "n_threads": n_threads}
+
+    # The read-statistics tables are shared by every sample, so their headers are
+    # written here once: workers only ever append to them, which keeps two samples
+    # finishing at the same time from truncating each other's rows
+    if not fasta_mode:
+        with open(prinseq_dir+"/reads_statistics_beforeQC.tsv", "w") as stats_file:
+            csv.writer(stats_file, delimiter="\t").writerow(["Sample", "R1Reads", "R1LenMean", "R1LenSd", "R2Reads", "R2LenMean", "R2LenSd"])
+        with open(prinseq_dir+"/reads_statistics_afterQC.tsv", "w") as stats_file:
+            csv.writer(stats_file, delimiter="\t").writerow(["Sample", "R1ReadsQC", "R1LenMeanQC", "R1LenSdQC", "R2ReadsQC", "R2LenMeanQC", "R2LenSdQC"])
+        if cfg.config["merge_reads"]:
+            with open(flash_dir+"/reads_statistics_FLASH.tsv", "w") as stats_file:
+                csv.writer(stats_file, delimiter="\t").writerow(["Sample", "JoinReads (%)", "JoinReads", "JoinLenMeanReads", "JoinLenSdReads", "UnjoinR1Reads", "UnjoinR1LenMeanReads", "UnjoinR1LenSdReads", "UnjoinR2Reads", "UnjoinR2LenMeanReads", "UnjoinR2LenSdReads"])
+
+    # Samples are independent (per-sample output directories prevent collisions), so they are
+    # dispatched across a process pool. Workers are capped so that pool_workers * n_threads
+    # does not oversubscribe the node.
+    # n_threads may be None (each tool then picks its own default), which counts
+    # as one thread per worker for the pool size
+    pool_workers = max(1, (os.cpu_count() or 1) // max(1, n_threads or 1))
+    with ProcessPoolExecutor(max_workers=pool_workers) as executor:
+        futures = [ (sample_basename, executor.submit(run_sample, sample_basename, data, sample_counter, n_samples, context))
+                    for sample_counter, (sample_basename, data) in enumerate(samples_data.items(), start=1)]
+        # A failing tool raises CalledProcessError in its worker; the broken sample is
+        # reported and excluded so it cannot waste time in the aggregate steps
+        sample_results = []
+        for sample_basename, future in futures:
+            try:
+                sample_results.append(future.result())
+            except CalledProcessError as error:
+                print(f"ERROR: {error.cmd[0]} exited with code {error.returncode} for sample {sample_basename}. "
+                      "The sample is excluded from the remaining steps.", flush=True)
+
+    # Aggregate per-sample results (input file order is preserved)
+    for result in sample_results:
+        sample_basename = result["sample"]
         samples_basenames.append(sample_basename)
-        
-        if not fasta_mode:
-            # Run trimmomatic or not
-            if cfg.config["trim_adaptors"]["run_trim_adaptors"]:
-                
-                print(Banner(f"\nStep {step_counter} for sequence {sample_counter}/{n_samples} ({sample_basename}): Trimmomatic\n"), flush=True)
-                trimmomatic_call(input_file1=sample_fw,
-                                input_file2=sample_rv,
-                                phred="-phred33",
-                                trimfile="ILLUMINACLIP:"+adapters_file+":1:30:11",
-                                paired_out_file1=trimmomatic_dir+"/"+sample_basename+"_R1_paired.fastq",
-                                unpaired_out_file1=trimmomatic_dir+"/"+sample_basename+"_R1_unpaired.fastq",
-                                paired_out_file2=trimmomatic_dir+"/"+sample_basename+"_R2_paired.fastq",
-                                unpaired_out_file2=trimmomatic_dir+"/"+sample_basename+"_R2_unpaired.fastq",
-                                threads = n_threads)
-                step_counter += 1
-                prinseq_input1 = trimmomatic_dir+"/"+sample_basename+"_R1_paired.fastq"
-                prinseq_input2 = trimmomatic_dir+"/"+sample_basename+"_R2_paired.fastq"
-            else:
-                prinseq_input1 = decompressed_samples_fw[sample_basename]
-                prinseq_input2 = decompressed_samples_rv[sample_basename]
-
-
-            # Create prinseq output directories
-            os.mkdir(prinseq_dir+"/"+sample_basename)
-
-            # Prinseq call
-            print(Banner(f"\nStep {step_counter} for sequence {sample_counter}/{n_samples} ({sample_basename}): Prinseq\n"), flush=True)
-            prinseq_call(input_file1=prinseq_input1,
-                        input_file2=prinseq_input2,
-                        output_folder=prinseq_dir+"/"+sample_basename,
-                        sample=sample_basename,
-                        log_name=prinseq_dir+"/"+sample_basename+"/"+sample_basename+".log")
-            step_counter += 1
-            
-            # Prinseq output files refactor
-            print("\nRefactoring prinseq output files\n", flush=True)
-            prinseq_files = refactor_prinseq_output(prinseq_dir+"/"+sample_basename, sample_basename)
-
-            # Kraken call
-            if cfg.config["species_identification"]["run_species_identification"]:
-                print(Banner(f"\nStep {step_counter} for sequence {sample_counter}/{n_samples} ({sample_basename}): Kraken\n"), flush=True)
-                
-                kraken_db_file = cfg.config["species_identification"]["species_identification_database"]
-                
-                # Check if database exists
-                if not os.path.exists(kraken_db_file):
-                    print("ERROR: Kraken database file does not exist.", flush=True)
-                    sys.exit(1)
-                kraken_out_report_file = kraken_dir+"/"+sample_basename+".tab"
-                kraken_genus, kraken_species = kraken_call(db_file=kraken_db_file, 
-                                                           output_file=kraken_out_report_file, 
-                                                           fw_file=prinseq_files["R1"], 
-                                                           rv_file=prinseq_files["R2"],
-                                                           threads = n_threads)
-                kraken_reports.append((sample_basename, kraken_out_report_file))
-                if not genus or not species:
-                    samples_genus[sample_basename] = kraken_genus
-                    samples_species[sample_basename] = kraken_species
-                step_counter += 1
-
-
-            # Flash call
-            if cfg.config["merge_reads"]:
-                print(Banner(f"\nStep {step_counter} for sequence {sample_counter}/{n_samples} ({sample_basename}): Flash\n"), flush=True)
-                flash_call(input_file_1=prinseq_files["R1"],
-                        input_file_2=prinseq_files["R2"],
-                        output_filename=sample_basename,
-                        output_dir=flash_dir+"/"+sample_basename,
-                        threads = n_threads)
-                step_counter += 1
-
-            # Quality reports
-            print(Banner(f"\nStep {step_counter} for sequence {sample_counter}/{n_samples} ({sample_basename}): Read statistics\n"), flush=True)
-            step_counter += 1
-            
-            report_pre_qc = get_reads_table(decompressed_samples_fw[sample_basename], decompressed_samples_rv[sample_basename], sample_basename, prinseq_dir+"/reads_statistics_beforeQC.tsv", False)
-
-            report_post_qc = get_reads_table(prinseq_files["R1"], prinseq_files["R2"], sample_basename, prinseq_dir+"/reads_statistics_afterQC.tsv", True)
-            if cfg.config["merge_reads"]:
-                report_post_flash = get_flash_reads_table(flash_dir+"/"+sample_basename+"/"+sample_basename+".extendedFrags.fastq", 
-                                    flash_dir+"/"+sample_basename+"/"+sample_basename+".notCombined_1.fastq",
-                                    flash_dir+"/"+sample_basename+"/"+sample_basename+".notCombined_2.fastq",
-                                    sample_basename, flash_dir+"/reads_statistics_FLASH.tsv", report_post_qc)
-
-            summary_pre_qc[sample_basename] = report_pre_qc
-            summary_post_qc[sample_basename] = report_post_qc
-            if cfg.config["merge_reads"]:
-                summary_post_flash[sample_basename] = report_post_flash
-
-            # Create SPAdes output directories
-            os.mkdir(spades_dir+"/"+sample_basename)
-
-            # SPAdes call
-            print(Banner(f"\nStep {step_counter} for sequence {sample_counter}/{n_samples} ({sample_basename}): SPAdes\n"), flush=True)
-            if cfg.config["merge_reads"]:        
-                spades_call(forward_sample=flash_dir+"/"+sample_basename+"/"+sample_basename+".notCombined_1.fastq",
-                            reverse_sample=flash_dir+"/"+sample_basename+"/"+sample_basename+".notCombined_2.fastq",
-                            sample=sample_basename,
-                            out_dir=spades_dir,
-                            merged_sample=flash_dir+"/"+sample_basename+"/"+sample_basename+".extendedFrags.fastq",
-                            threads = n_threads)
-            else:
-                spades_call(forward_sample=prinseq_dir+"/"+sample_basename+"/"+sample_basename+"_R1.fastq",
-                            reverse_sample=prinseq_dir+"/"+sample_basename+"/"+sample_basename+"_R2.fastq",
-                            sample=sample_basename,
-                            out_dir=spades_dir,
-                            threads = n_threads)
-            step_counter += 1
-
-            # Get minimum contig length
-            # min_contig_threshold = get_reads_length(prinseq_dir+"/"+sample_basename+"/"+sample_basename+"_R1.fastq") * 2
-            min_contig_threshold = cfg.config["min_contig_len"]
-
-            # Trim short contigs and shorten sequences id
-            contigs_trim_and_rename(contigs_file=spades_dir+"/"+sample_basename+"/"+"contigs.fasta",
-                                    output_filename=sample_basename+".fasta",
-                                    output_dir=contigs_dir,
-                                    min_len=min_contig_threshold)
-            sample_contigs = contigs_dir+"/"+sample_basename+".fasta"
-        else:
-            min_contig_threshold = cfg.config["min_contig_len"]
-            # If in fasta mode, we just skip everything until this point
-            if compressed_mode:
-                sample_contigs = decompressed_samples[sample_basename]
-            else:
-                sample_contigs = data["FW"]
-
-            # Kraken call
-            if cfg.config["species_identification"]["run_species_identification"]:
-                print(Banner(f"\nStep {step_counter} for sequence {sample_counter}/{n_samples} ({sample_basename}): Kraken\n"), flush=True)
-                
-                kraken_db_file = "./db/minikraken-DB/minikraken_8GB_20200312"
-                
-                # Check if database exists
-                if not os.path.exists(kraken_db_file):
-                    print("ERROR: Kraken database file does not exist.", flush=True)
-                    sys.exit(1)
-
-                kraken_out_report_file = kraken_dir+"/"+sample_basename+".tab" 
-                kraken_genus, kraken_species = kraken_call(db_file=kraken_db_file, 
-                                                           output_file=kraken_out_report_file, 
-                                                           fw_file=sample_fw,
-                                                           threads = n_threads)
-                if not genus or not species:
-                    samples_genus[sample_basename] = kraken_genus
-                    samples_species[sample_basename] = kraken_species
-                kraken_reports.append((sample_basename, kraken_out_report_file))
-                step_counter += 1
-            
-        # Reordering contigs by a reference genome with MauveCM
-        if cfg.config["reference_genome"]["file"]:
-            print(Banner(f"\nStep {step_counter} for sequence {sample_counter}/{n_samples} ({sample_basename}): reordering {sample_basename} genome against reference genome\n"), flush=True)
-            draft_contigs = mauve_call(output_folder=mauve_dir,
-                                        reference_sequence=reference_genome_file,
-                                        input_contigs=sample_contigs,
-                                        sample_basename=sample_basename)
-            step_counter += 1
-            draft_contigs_dir = mauve_dir
-        else:
-            if fasta_mode:
-                draft_contigs = sample_contigs
-                # Copy contigs to contigs_dir
-                shutil.copyfile(draft_contigs, contigs_dir+"/"+sample_basename+".fasta")
-            else:
-                draft_contigs = contigs_dir+"/"+sample_basename+".fasta"
-            draft_contigs_dir = contigs_dir
-
-
-        # Create Quast output directories
-        quast_sample_dir = sample_basename+"_assembly_statistics"
-        if fasta_mode: # In fasta mode the Spades directory does not exist
-            quast_dir = output_folder+"/Quast/"
-            assembly_dir = quast_dir
-            os.makedirs(assembly_dir+quast_sample_dir)
-        else:
-            assembly_dir = spades_dir
-            quast_dir = assembly_dir+"/"+sample_basename+"/"
-            os.mkdir(quast_dir+quast_sample_dir)
-            
-            
-        
-
-        # Quast call
-        print(Banner(f"\nStep {step_counter} for sequence {sample_counter}/{n_samples} ({sample_basename}): Quast\n"), flush=True)
-        quast_call( input_file=draft_contigs,
-                    output_dir=assembly_dir+"/"+sample_basename+"/"+quast_sample_dir,
-                    min_contig_len=min_contig_threshold,
-                    threads = n_threads)
-        step_counter += 1
-
-        if cfg.config["annotation"]["run_annotation"]:
-            # Annotation (Prokka or dfast)
-            if annotator.lower() == "dfast":
-                # Dfast call
-                annotation_dir = dfast_dir
-                print(Banner(f"\nStep {step_counter} for sequence {sample_counter}/{n_samples} ({sample_basename}): Dfast\n"), flush=True)
-                dfast_call(locus_tag=sample_basename+"_L",
-                        contigs_file=draft_contigs,
-                        output_dir=dfast_dir+"/"+sample_basename,
-                        sample_basename=sample_basename,
-                        organism=samples_genus[sample_basename]+" "+samples_species[sample_basename],
-                    threads = n_threads)
-                step_counter += 1
-
-                refactor_gff_from_dfast(dfast_dir+"/"+sample_basename+"/"+sample_basename+".gff", 
-                                        dfast_refactor_dir+"/"+sample_basename+".gff",
-                                        roary_input_dir+"/"+sample_basename+".gff")
-                # Set roary input files
-                roary_input_files.append(roary_input_dir+"/"+sample_basename+".gff")
-
-            else:
-                # Prokka call
-                annotation_dir = prokka_dir
-                print(Banner(f"\nStep {step_counter} for sequence {sample_counter}/{n_samples} ({sample_basename}): Prokka\n"), flush=True)
-                prokka_call(locus_tag=sample_basename+"_L",
-                            output_dir=prokka_dir+"/"+sample_basename,
-                            prefix=sample_basename,
-                            input_file=draft_contigs,
-                            genus=samples_genus[sample_basename],
-                            species=samples_species[sample_basename],
-                            strain=sample_basename,
-                            proteins=cfg.config["reference_genome"]["proteins"],
-                            rawproduct=cfg.config["annotation"]["prokka"]["rawproduct"],
-                            threads = n_threads)
-                step_counter += 1
-                if cfg.config["antimicrobial_resistance_genes"]["run_antimicrobial_resistance_genes_prediction"]:
-                    if "amrfinder" in cfg.config["antimicrobial_resistance_genes"]["antimicrobial_resistance_genes_predictor_tool"]:
-                        refactor_gff_from_prokka(prokka_dir+"/"+sample_basename+"/"+sample_basename+".gff", prokka_refactor_dir+"/"+sample_basename+".gff")
-                # Set roary input files
-                roary_input_files.append(annotation_dir+"/"+sample_basename+"/"+sample_basename+".gff")
-        
-
-        if cfg.config["run_variant_calling"]:
-            print(Banner(f"\nStep {step_counter} for sequence {sample_counter}/{n_samples} ({sample_basename}): SNIPPY\n"), flush=True)
-            if reference_genome_file:
-                # SNPs identification (SNIPPY)
-                step_counter += 1
-                reference_genome_filename = reference_genome_file.split("/")[-1]
-                reference_genome_basename = reference_genome_filename.split(".")[-2]
-                if cfg.config["reference_genome"]["proteins"]:
-                    ref_genome = cfg.config["reference_genome"]["proteins"]
-                else:
-                    ref_genome = cfg.config["reference_genome"]["file"]
-                snippy_call(reference_genome=ref_genome,
-                            contigs=draft_contigs,
-                            output_dir=snps_dir+"/"+sample_basename,
-                            prefix=sample_basename,
-                            threads = n_threads)
-                snippy_output_files.append(snps_dir+"/"+sample_basename+"/"+sample_basename+".txt")
-            else:
-                # We cannot run SNIPPY without a reference genome
-                print("ERROR: You must provide a reference genome to run SNIPPY.", flush=True)
+        samples_genus[sample_basename] = result["genus"]
+        samples_species[sample_basename] = result["species"]
+        if result["kraken_report"]:
+            kraken_reports.append((sample_basename, result["kraken_report"]))
+        if result["report_pre_qc"]:
+            summary_pre_qc[sample_basename] = result["report_pre_qc"]
+        if result["report_post_qc"]:
+            summary_post_qc[sample_basename] = result["report_post_qc"]
+        if result["report_post_flash"]:
+            summary_post_flash[sample_basename] = result["report_post_flash"]
+        if result["roary_input_file"]:
+            roary_input_files.append(result["roary_input_file"])
+        if result["snippy_output_file"]:
+            snippy_output_files.append(result["snippy_output_file"])
+
+    # These were set inside the per-sample loop before, but they only depend on the config
+    if cfg.config["reference_genome"]["file"]:
+        draft_contigs_dir = mauve_dir
+    else:
+        draft_contigs_dir = contigs_dir
+    if fasta_mode: # In fasta mode the Spades directory does not exist
+        assembly_dir = output_folder+"/Quast/"
+    else:
+        assembly_dir = spades_dir
+    if cfg.config["annotation"]["run_annotation"]:
+        annotation_dir = dfast_dir if annotator.lower() == "dfast" else prokka_dir
+    step_counter = max(result["steps"] for result in sample_results) if sample_results else 1
 
     # Kraken combined report
     if cfg.config["species_identification"]["run_species_identification"]:
@@ -2152,16 +2367,23 @@ if __name__ == "__main__":
     # Quast report unification
     quast_report_unification(assembly_dir, samples_basenames, assembly_dir)
 
+    # MLST, ABRicate and BLAST all work on the same draft genomes; list the
+    # directory once, keeping only regular files (a failed sample leaves no
+    # fasta behind, so nothing stray ends up in the downstream tool calls)
+    contigs_files = sorted(entry.path for entry in os.scandir(draft_contigs_dir)
+                           if entry.name.endswith(".fasta") and entry.is_file())
+
     # MLST call
     if cfg.config["MLST"]["run_mlst"]:
         mlst_out_file = "MLST.txt"
         print(Banner(f"\nStep {step_counter}: MLST\n"), flush=True)
         step_counter += 1
-        mlst_call(input_dir=draft_contigs_dir,  
+        mlst_call(input_dir=draft_contigs_dir,
                 reference_file=reference_genome_file,
                 output_dir=mlst_dir,
                 output_filename=mlst_out_file,
-                threads = n_threads)
+                threads = n_threads,
+                input_filenames=contigs_files)
         if cfg.config["MLST"]["include_cc"]:
             # MLST postprocessing
             mlst_postprocessing(mlst_dir+"/"+mlst_out_file, mlst_dir+"/MLST_and_CC.txt")
@@ -2176,24 +2398,37 @@ if __name__ == "__main__":
         if "abricate" in cfg.config["virulence_genes"]["virulence_genes_predictor_tool"]:
             global_vf_output_file = "Virulence_genes_ABRicate.tsv"
             global_vf_matrix_file = "Virulence_genes_ABRicate_matrix.tsv"
-            for vf_database in cfg.config["virulence_genes"]["abricate"]["virulence_factors_databases"]:
-                print(Banner(f"\nStep {step_counter}: Virulence genes (ABRicate: "+vf_database+")\n"), flush=True)
-                step_counter += 1
+            vf_databases = cfg.config["virulence_genes"]["abricate"]["virulence_factors_databases"]
+            abricate_samples_basenames = samples_basenames.copy()
+            if cfg.config["reference_genome"]["strain"]:
+                abricate_samples_basenames.append(cfg.config["reference_genome"]["strain"])
+
+            print(Banner(f"\nStep {step_counter}: Virulence genes (ABRicate: "+", ".join(vf_databases)+")\n"), flush=True)
+            step_counter += 1
+
+            # Same pattern as the AMR databases below: the per-database runs are
+            # independent, so each one only needs a thread to wait on its subprocess
+            with ThreadPoolExecutor(max_workers=len(vf_databases)) as abricate_executor:
+                abricate_futures = [abricate_executor.submit(abricate_call,
+                                        input_dir=draft_contigs_dir,
+                                        output_dir=vir_dir,
+                                        output_filename="Virulence_genes_ABRicate_"+vf_db+".tsv",
+                                        database=vf_db,
+                                        mincov=cfg.config["virulence_genes"]["abricate"]["mincov"],
+                                        minid=cfg.config["virulence_genes"]["abricate"]["minid"],
+                                        gene_matrix_file="Virulence_genes_ABRicate_"+vf_db+"_matrix.tsv",
+                                        samples=abricate_samples_basenames,
+                                        threads = n_threads,
+                                        input_filenames=contigs_files)
+                                    for vf_db in vf_databases]
+                for abricate_future in abricate_futures:
+                    abricate_future.result()
+
+            # The global files must keep the database order, so concatenation stays serial
+            for vf_database in vf_databases:
                 vf_output_file = "Virulence_genes_ABRicate_"+vf_database+".tsv"
                 vf_matrix_file = "Virulence_genes_ABRicate_"+vf_database+"_matrix.tsv"
-                abricate_samples_basenames = samples_basenames.copy()
-                if cfg.config["reference_genome"]["strain"]:
-                    abricate_samples_basenames.append(cfg.config["reference_genome"]["strain"])        
-                abricate_call(input_dir=draft_contigs_dir,
-                            output_dir=vir_dir,
-                            output_filename=vf_output_file,
-                            database=vf_database,
-                            mincov=cfg.config["virulence_genes"]["abricate"]["mincov"],
-                            minid=cfg.config["virulence_genes"]["abricate"]["minid"],
-                            gene_matrix_file=vf_matrix_file,
-                            samples=abricate_samples_basenames,
-                            threads = n_threads)
-                
+
                 # Concatenate every ABRicate output in a single file
                 with open(vir_dir+"/"+global_vf_output_file, "a") as global_file, open(vir_dir+"/"+vf_output_file, "r") as current_file:
                     if os.stat(vir_dir+"/"+global_vf_output_file).st_size == 0:   # If global file is empty, i.e. there is no header
@@ -2226,9 +2461,6 @@ if __name__ == "__main__":
         if "blast" in cfg.config["virulence_genes"]["virulence_genes_predictor_tool"]:
             print(Banner(f"\nStep {step_counter}: Virulence genes (BLAST against inhouse database)\n"), flush=True)
             step_counter += 1
-            # Every fasta file in draft_contigs_dir is a sample
-            contig_files = ([os.path.join(draft_contigs_dir, f) for f in os.listdir(draft_contigs_dir) if f.endswith(".fasta")])
-
             blast_output_name = "BLAST_inhouse_VFDB.txt"
             proteins_file = cfg.config["virulence_genes"]["blast"]["proteins_reference_file"]
             dna_database_blast = blast_proteins_dir+"/DNA_database"
@@ -2238,7 +2470,8 @@ if __name__ == "__main__":
             if not os.path.exists(dna_database_blast):
                 os.mkdir(dna_database_blast)
 
-            blast_contigs_files_paths = contig_files.copy()
+            # Every fasta file in draft_contigs_dir is a sample
+            blast_contigs_files_paths = contigs_files.copy()
             blast_samples_basenames = samples_basenames.copy()
             if cfg.config["reference_genome"]["file"]:
                 ref_genome = cfg.config["reference_genome"]["file"]
@@ -2292,7 +2525,8 @@ if __name__ == "__main__":
                     minid=cfg.config["plasmids"]["abricate"]["minid"],
                     gene_matrix_file=plasmids_matrix_file,
                     samples=abricate_samples_basenames,
-                    threads = n_threads)
+                    threads = n_threads,
+                    input_filenames=contigs_files)
 
         # Delete plasmids_matrix_file if it contains only one line
         with open(plasmid_dir+"/"+plasmids_matrix_file, 'r') as f:
@@ -2316,23 +2550,36 @@ if __name__ == "__main__":
         if "abricate" in cfg.config["antimicrobial_resistance_genes"]["antimicrobial_resistance_genes_predictor_tool"]:
             global_amr_output_file = "AMR_ABRicate.tsv"
             global_amr_matrix_file = "AMR_genes_ABRicate_matrix.tsv"
-            for amr_db in cfg.config["antimicrobial_resistance_genes"]["abricate"]["antimicrobial_resistance_databases"]:
-                print(Banner(f"\nStep {step_counter}: Antimicrobial resistance genes (ABRicate: "+amr_db+")\n"), flush=True)
-                step_counter += 1
+            amr_databases = cfg.config["antimicrobial_resistance_genes"]["abricate"]["antimicrobial_resistance_databases"]
+            abricate_samples_basenames = samples_basenames.copy()
+            if cfg.config["reference_genome"]["strain"]:
+                abricate_samples_basenames.append(cfg.config["reference_genome"]["strain"])
+
+            print(Banner(f"\nStep {step_counter}: Antimicrobial resistance genes (ABRicate: "+", ".join(amr_databases)+")\n"), flush=True)
+            step_counter += 1
+
+            # The per-database ABRicate runs are independent and write disjoint files,
+            # so each one only needs a thread to wait on its subprocess
+            with ThreadPoolExecutor(max_workers=len(amr_databases)) as abricate_executor:
+                abricate_futures = [abricate_executor.submit(abricate_call,
+                                        input_dir=draft_contigs_dir,
+                                        output_dir=amr_analysis_dir_abr,
+                                        output_filename="AMR_ABRicate_"+amr_db+".tsv",
+                                        database=amr_db,
+                                        mincov=cfg.config["antimicrobial_resistance_genes"]["abricate"]["mincov"],
+                                        minid=cfg.config["antimicrobial_resistance_genes"]["abricate"]["minid"],
+                                        gene_matrix_file="AMR_genes_ABRicate_"+amr_db+"_matrix.tsv",
+                                        samples=abricate_samples_basenames,
+                                        threads = n_threads,
+                                        input_filenames=contigs_files)
+                                    for amr_db in amr_databases]
+                for abricate_future in abricate_futures:
+                    abricate_future.result()
+
+            # The global files must keep the database order, so concatenation stays serial
+            for amr_db in amr_databases:
                 amr_output_file = "AMR_ABRicate_"+amr_db+".tsv"
                 amr_matrix_file = "AMR_genes_ABRicate_"+amr_db+"_matrix.tsv"
-                abricate_samples_basenames = samples_basenames.copy()
-                if cfg.config["reference_genome"]["strain"]:
-                    abricate_samples_basenames.append(cfg.config["reference_genome"]["strain"])
-                abricate_call(input_dir=draft_contigs_dir, 
-                            output_dir=amr_analysis_dir_abr,
-                            output_filename=amr_output_file,
-                            database=amr_db,
-                            mincov=cfg.config["antimicrobial_resistance_genes"]["abricate"]["mincov"],
-                            minid=cfg.config["antimicrobial_resistance_genes"]["abricate"]["minid"],
-                            gene_matrix_file=amr_matrix_file,
-                            samples=abricate_samples_basenames,
-                            threads = n_threads)
 
                 # Concatenate every ABRicate output in a single file
                 with open(amr_analysis_dir_abr+"/"+global_amr_output_file, "a") as global_file, open(amr_analysis_dir_abr+"/"+amr_output_file, "r") as current_file:
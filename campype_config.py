@@ -16,7 +16,8 @@ config = {
     },
     "trim_adaptors":{
       "run_trim_adaptors": True, # Remove adapter sequences from reads if set to True. Otherwise, set to False. Default: True
-      "adapters_reference_file": "reference_files/adapters_and_sequences.fa"   # Location of the sequences to filter. You can edit this file with any sequence you want to filter. Default: "reference_files/adapters_and_sequences.fa"
+      "adapters_reference_file": "reference_files/adapters_and_sequences.fa",   # Location of the sequences to filter. You can edit this file with any sequence you want to filter. Default: "reference_files/adapters_and_sequences.fa"
+      "stream_to_prinseq": False # Stream the Trimmomatic paired outputs into Prinseq through named pipes instead of writing them to disk. Saves tens of GB of intermediate I/O per sample. Default: False
     },
     "read_qc_filtering": {
         "min_len": 50, # Minimum read length. Default: 50